@@ -1,21 +1,30 @@
-from pubmed_fetcher.fetcher import fetch_pubmed_ids, fetch_paper_details, save_to_csv
+import argparse
+
+from pubmed_fetcher.fetcher import disable_cache, fetch_pubmed_ids, fetch_paper_details, save_to_csv
 
 def main():
     """Main CLI function for fetching PubMed papers."""
+    parser = argparse.ArgumentParser(description="Fetch PubMed papers and save them to CSV.")
+    parser.add_argument("query", nargs="?", help="PubMed search query (prompted for when omitted)")
+    parser.add_argument("-n", "--max-results", type=int, default=10, help="maximum number of results (default 10, at most 9999)")
+    parser.add_argument("-o", "--output", default="output.csv", help="output CSV filename (default 'output.csv')")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and skip the local response cache")
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        disable_cache()
+    
     print("=== PubMed Paper Fetcher ===")
     
-    # Get user input
-    query = input("Enter PubMed search query: ")
+    # Prompt only for the query; the result count and filename come from the options
+    query = args.query if args.query is not None else input("Enter PubMed search query: ")
+    max_results = args.max_results
+    filename = args.output
     
-    # Ask for number of results
-    try:
-        max_results = int(input("Enter maximum number of results (default 10): ") or "10")
-    except ValueError:
+    if max_results < 1:
         max_results = 10
-        print("Invalid input. Using default of 10 results.")
+        print("Maximum number of results must be positive. Using default of 10 results.")
     
-    # Get output filename
-    filename = input("Enter output filename (default 'output.csv'): ") or "output.csv"
     if not filename.endswith('.csv'):
         filename += '.csv'
     
@@ -48,14 +57,13 @@ def main():
     print(f"Output file: {filename}")
     
     # Show first paper as preview
-    if results:
-        print(f"\n=== First Paper Preview ===")
-        first_paper = results[0]
-        print(f"Title: {first_paper.get('title', 'N/A')}")
-        print(f"Authors: {first_paper.get('authors', 'N/A')}")
-        print(f"Journal: {first_paper.get('journal', 'N/A')}")
-        print(f"Date: {first_paper.get('publication_date', 'N/A')}")
-        print(f"PubMed URL: {first_paper.get('pubmed_url', 'N/A')}")
+    print(f"\n=== First Paper Preview ===")
+    first_paper = results[0]._asdict()
+    print(f"Title: {first_paper['title'] or 'N/A'}")
+    print(f"Authors: {first_paper['authors'] or 'N/A'}")
+    print(f"Journal: {first_paper['journal'] or 'N/A'}")
+    print(f"Date: {first_paper['publication_date'] or 'N/A'}")
+    print(f"PubMed URL: {first_paper['pubmed_url'] or 'N/A'}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,13 +1,167 @@
+import atexit
+import csv
+import multiprocessing
+import os
 import requests
-import pandas as pd
-import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional
+import requests_cache
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from io import BytesIO, StringIO
+from itertools import chain
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Tuple
+
+# lxml parses much faster; the stdlib parser is a drop-in fallback when it is unavailable
+try:
+    from lxml import etree
+    HAS_LXML = True
+    XMLParseError = etree.XMLSyntaxError
+except ImportError:
+    import xml.etree.ElementTree as etree
+    HAS_LXML = False
+    XMLParseError = etree.ParseError
 
 PUBMED_API = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 DETAILS_API = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
 
+# Largest retmax esearch accepts; PubMed will not page a search past this point either
+MAX_RETMAX = 9999
+
+# An NCBI API key (read from the environment) raises the E-utilities rate limit
+# from 3 to 10 requests/second
+NCBI_API_KEY = os.environ.get("NCBI_API_KEY")
+
+# Minimum spacing between requests sent to NCBI, matching that rate limit
+REQUEST_INTERVAL = 1 / 10 if NCBI_API_KEY else 1 / 3
+
+# Ids per efetch request, and how many requests may be in flight at once
+EFETCH_CHUNK_SIZE = 200
+EFETCH_WORKERS = 10 if NCBI_API_KEY else 3
+
+# Responses that are retried, and how many times, before giving up on a request
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+STATUS_RETRIES = 3
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that starts at most one request attempt per interval across all threads."""
+
+    def __init__(self, interval: float, status_retries: int = 0, **kwargs):
+        self._interval = interval
+        self._status_retries = status_retries
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        super().__init__(**kwargs)
+
+    def _wait_for_slot(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def send(self, request, **kwargs):
+        # Status retries happen here rather than in urllib3 so every attempt takes a slot
+        for attempt in range(self._status_retries + 1):
+            self._wait_for_slot()
+            response = super().send(request, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == self._status_retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            response.close()
+            if retry_after.isdigit():
+                time.sleep(int(retry_after))
+
+# Responses are cached on disk, keyed by endpoint and parameters, so repeated or
+# overlapping queries are served locally until CACHE_EXPIRE_AFTER seconds have passed
+CACHE_PATH = Path.home() / ".cache" / "pubmed-fetcher" / "http"
+CACHE_EXPIRE_AFTER = 24 * 3600
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests_cache.CachedSession:
+    """Return the shared E-utilities session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests_cache.CachedSession(
+                cache_name=str(CACHE_PATH),
+                backend="sqlite",
+                expire_after=CACHE_EXPIRE_AFTER,
+                allowable_methods=("GET", "POST"),
+                ignored_parameters=["api_key"],
+            )
+            # Drop expired responses so the cache file does not grow without bound
+            session.cache.delete(expired=True)
+            # requests' default Accept-Encoding already asks for compressed responses
+            # (efetch XML shrinks roughly 8x), including brotli/zstd when installed
+            session.headers.update({"User-Agent": "pubmed-paper-fetcher/1.0"})
+            session.mount(
+                "https://",
+                _RateLimitedAdapter(
+                    REQUEST_INTERVAL,
+                    status_retries=STATUS_RETRIES,
+                    pool_connections=8,
+                    pool_maxsize=16,
+                    # urllib3 only retries connection errors; efetch is sent as POST but is
+                    # idempotent, so it is as safe to retry as esearch
+                    max_retries=Retry(
+                        total=3,
+                        backoff_factor=0.5,
+                        allowed_methods=frozenset({"GET", "POST"}),
+                        respect_retry_after_header=False,
+                    ),
+                ),
+            )
+            if NCBI_API_KEY:
+                session.params["api_key"] = NCBI_API_KEY
+            atexit.register(session.close)
+            _session = session
+        return _session
+
+# Parser processes start while fetch threads run, so they must not be forked directly
+PARSE_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# CSV column order, chosen for readability
+DESIRED_COLUMNS = [
+    "pmid", "title", "authors", "journal", "publication_date",
+    "volume", "issue", "pages", "abstract", "keywords", "doi", "pubmed_url"
+]
+
+# One flat record per paper, with fields in CSV column order; missing values are ""
+Paper = namedtuple("Paper", DESIRED_COLUMNS)
+
+# CSV output is formatted WRITE_BATCH_ROWS rows at a time and handed to a single
+# large file buffer, so the OS sees a few big writes instead of one per row
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+WRITE_BATCH_ROWS = 1024
+
+# Date elements in order of preference for publication_date
+DATE_TAGS = ("PubDate", "ArticleDate", "DateCompleted", "DateRevised")
+
+# PubDate months are often abbreviated names rather than numbers
+MONTH_MAP = {
+    "Jan": "01", "Feb": "02", "Mar": "03", "Apr": "04", "May": "05", "Jun": "06",
+    "Jul": "07", "Aug": "08", "Sep": "09", "Oct": "10", "Nov": "11", "Dec": "12",
+}
+
+def disable_cache():
+    """Bypass the response cache for the rest of this run."""
+    get_session().settings.disabled = True
+
 def fetch_pubmed_ids(query: str, max_results: int = 10) -> List[str]:
-    """Fetch PubMed IDs for a given query."""
+    """Fetch PubMed IDs for a given query, up to MAX_RETMAX of them."""
+    if max_results > MAX_RETMAX:
+        print(f"PubMed returns at most {MAX_RETMAX} results per search; limiting to {MAX_RETMAX}.")
+        max_results = MAX_RETMAX
     params = {
         "db": "pubmed",
         "term": query,
@@ -15,198 +169,273 @@ def fetch_pubmed_ids(query: str, max_results: int = 10) -> List[str]:
         "retmax": max_results,
     }
     try:
-        response = requests.get(PUBMED_API, params=params)
+        response = get_session().get(PUBMED_API, params=params)
         response.raise_for_status()
         data = response.json()
-        return data.get("esearchresult", {}).get("idlist", [])
     except requests.RequestException as e:
         print(f"Error fetching PubMed IDs: {e}")
         return []
+    result = data.get("esearchresult", {})
+    if result.get("ERROR"):
+        print(f"Error fetching PubMed IDs: {result['ERROR']}")
+        return []
+    return result.get("idlist", [])
 
-def extract_authors(article) -> str:
-    """Extract author names from article XML."""
-    authors = []
-    author_list = article.find(".//AuthorList")
-    if author_list is not None:
-        for author in author_list.findall("Author"):
-            lastname = author.find("LastName")
-            forename = author.find("ForeName")
-            if lastname is not None and forename is not None:
-                authors.append(f"{forename.text} {lastname.text}")
-            elif lastname is not None:
-                authors.append(lastname.text)
-    return "; ".join(authors)
-
-def extract_date(article) -> Optional[str]:
-    """Extract publication date from article XML."""
-    date_elements = [
-        ".//PubDate",
-        ".//ArticleDate",
-        ".//DateCompleted",
-        ".//DateRevised"
-    ]
-    
-    for date_path in date_elements:
-        date_elem = article.find(date_path)
-        if date_elem is not None:
-            year = date_elem.find("Year")
-            month = date_elem.find("Month")
-            day = date_elem.find("Day")
-            
-            if year is not None:
-                date_str = year.text
-                if month is not None:
-                    date_str += f"-{month.text.zfill(2)}"
-                    if day is not None:
-                        date_str += f"-{day.text.zfill(2)}"
-                return date_str
-    return None
-
-def extract_abstract(article) -> str:
-    """Extract abstract from article XML."""
-    abstract_elem = article.find(".//Abstract")
-    if abstract_elem is not None:
-        abstract_texts = []
-        for text_elem in abstract_elem.findall(".//AbstractText"):
-            if text_elem.text:
-                label = text_elem.get("Label")
-                if label:
-                    abstract_texts.append(f"{label}: {text_elem.text}")
-                else:
-                    abstract_text = text_elem.text
-                    if abstract_text:
-                        abstract_texts.append(abstract_text)
-        
-        if abstract_texts:
-            return " ".join(abstract_texts)
-    return ""
-
-def extract_keywords(article) -> str:
-    """Extract keywords from article XML."""
-    keywords = []
-    keyword_lists = article.findall(".//KeywordList")
-    for keyword_list in keyword_lists:
-        for keyword in keyword_list.findall("Keyword"):
-            if keyword.text:
-                keywords.append(keyword.text)
-    return "; ".join(keywords)
-
-def extract_journal_info(article) -> Dict[str, str]:
-    """Extract journal information from article XML."""
-    journal_info = {}
-    
-    # Journal name
-    journal_elem = article.find(".//Journal/Title")
-    if journal_elem is not None:
-        journal_info["journal"] = journal_elem.text
-    else:
-        journal_elem = article.find(".//MedlineJournalInfo/MedlineTA")
-        if journal_elem is not None:
-            journal_info["journal"] = journal_elem.text
-    
-    # Volume and issue
-    volume_elem = article.find(".//JournalIssue/Volume")
-    if volume_elem is not None:
-        journal_info["volume"] = volume_elem.text
-    
-    issue_elem = article.find(".//JournalIssue/Issue")
-    if issue_elem is not None:
-        journal_info["issue"] = issue_elem.text
-    
-    # Pages
-    pages_elem = article.find(".//Pagination/MedlinePgn")
-    if pages_elem is not None:
-        journal_info["pages"] = pages_elem.text
-    
-    return journal_info
-
-def fetch_paper_details(paper_ids: List[str]) -> List[Dict]:
+def fetch_paper_details(paper_ids: List[str]) -> List[Paper]:
     """Fetch detailed information for given PubMed IDs."""
     if not paper_ids:
         return []
 
-    params = {
+    chunks = [
+        paper_ids[start:start + EFETCH_CHUNK_SIZE]
+        for start in range(0, len(paper_ids), EFETCH_CHUNK_SIZE)
+    ]
+    if len(chunks) == 1:
+        xml = _fetch_chunk(chunks[0])
+        return [] if xml is None else _parse_chunk(xml)
+
+    # Parsing is CPU-bound, so it runs in processes to get past the GIL. Each chunk is
+    # handed to a parser as soon as it arrives, overlapping network waits with parsing;
+    # results are put back in request order at the end.
+    parses = {}
+    with ThreadPoolExecutor(max_workers=EFETCH_WORKERS) as io_pool, \
+            ProcessPoolExecutor(
+                max_workers=min(len(chunks), os.cpu_count() or 1), mp_context=PARSE_MP_CONTEXT
+            ) as cpu_pool:
+        fetches = {io_pool.submit(_fetch_chunk, chunk): index for index, chunk in enumerate(chunks)}
+        for fetch in as_completed(fetches):
+            xml = fetch.result()
+            if xml is not None:
+                parses[fetches[fetch]] = cpu_pool.submit(_parse_chunk, xml)
+        papers = chain.from_iterable(parses[index].result() for index in sorted(parses))
+        return _share_strings(papers)
+
+def _share_strings(papers) -> List[Paper]:
+    """Re-intern journal, volume and issue on papers returned by parser processes."""
+    intern = sys.intern
+    return [
+        paper._replace(journal=intern(paper.journal), volume=intern(paper.volume), issue=intern(paper.issue))
+        for paper in papers
+    ]
+
+def _fetch_chunk(paper_ids: List[str]) -> Optional[bytes]:
+    """Fetch the efetch XML for one batch of PubMed IDs."""
+    data = {
         "db": "pubmed",
         "id": ",".join(paper_ids),
         "retmode": "xml"
     }
     
     try:
-        response = requests.get(DETAILS_API, params=params)
+        response = get_session().post(DETAILS_API, data=data)
         response.raise_for_status()
-        xml_data = response.text
+        return response.content
     except requests.RequestException as e:
         print(f"Error fetching paper details: {e}")
-        return []
+        return None
 
-    # Parse XML
+def _parse_chunk(xml_bytes: bytes) -> List[Paper]:
+    """Parse one efetch XML response into Paper records."""
     try:
-        root = ET.fromstring(xml_data)
-    except ET.ParseError as e:
+        return _parse_articles(BytesIO(xml_bytes))
+    except XMLParseError as e:
         print(f"Error parsing XML: {e}")
         return []
 
-    papers = []
-    for article in root.findall(".//PubmedArticle"):
-        paper_info = {}
-        
-        # Extract PMID
-        pmid_elem = article.find(".//PMID")
-        if pmid_elem is not None:
-            paper_info["pmid"] = pmid_elem.text
-        
-        # Extract title
-        title_elem = article.find(".//ArticleTitle")
-        if title_elem is not None:
-            title_text = ET.tostring(title_elem, method='text', encoding='unicode')
-            paper_info["title"] = title_text.strip()
-        
-        # Extract authors
-        paper_info["authors"] = extract_authors(article)
-        
-        # Extract publication date
-        paper_info["publication_date"] = extract_date(article)
-        
-        # Extract journal information
-        journal_info = extract_journal_info(article)
-        paper_info.update(journal_info)
-        
-        # Extract abstract
-        paper_info["abstract"] = extract_abstract(article)
-        
-        # Extract keywords
-        paper_info["keywords"] = extract_keywords(article)
-        
-        # Extract DOI
-        doi_elem = article.find(".//ArticleId[@IdType='doi']")
-        if doi_elem is not None:
-            paper_info["doi"] = doi_elem.text
-        
-        # Extract PubMed URL
-        paper_info["pubmed_url"] = f"https://pubmed.ncbi.nlm.nih.gov/{paper_info.get('pmid', '')}"
+def _parse_articles(source) -> List[Paper]:
+    """Stream-parse PubmedArticle elements from a file-like XML source."""
+    return [extract_paper(article) for article in _iter_articles(source)]
+
+def _iter_articles(source):
+    """Yield PubmedArticle elements one at a time, freeing each once it has been handled."""
+    if HAS_LXML:
+        # Parse the way defusedxml would: never expand entities or touch the network
+        # for DTDs, since the XML comes from a remote service
+        articles = etree.iterparse(
+            source, events=("end",), tag="PubmedArticle", resolve_entities=False, no_network=True
+        )
+        for _, article in articles:
+            yield article
+            # Free the processed article and any already-handled siblings
+            article.clear()
+            while article.getprevious() is not None:
+                del article.getparent()[0]
+    else:
+        context = etree.iterparse(source, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event == "end" and elem.tag == "PubmedArticle":
+                yield elem
+                # Drop every finished article; only the open root element remains
+                root.clear()
+
+def extract_paper(article) -> Paper:
+    """Extract paper details from a PubmedArticle element in a single walk."""
+    pmid = doi = ""
+    title = journal = volume = issue = pages = ""
+    medline_ta = ""
+    authors = []
+    abstract_texts = []
+    keywords = []
+    dates = {}
+
+    for section in article:
+        if section.tag == "MedlineCitation":
+            for elem in section:
+                tag = elem.tag
+                if tag == "PMID":
+                    pmid = elem.text or ""
+                elif tag == "Article":
+                    title, journal, volume, issue, pages = _walk_article(elem, authors, abstract_texts, dates)
+                elif tag == "MedlineJournalInfo":
+                    for info in elem:
+                        if info.tag == "MedlineTA":
+                            medline_ta = sys.intern(info.text or "")
+                elif tag == "KeywordList":
+                    for keyword in elem:
+                        if keyword.tag == "Keyword":
+                            text = "".join(keyword.itertext())
+                            if text:
+                                keywords.append(text)
+                elif tag == "DateCompleted" or tag == "DateRevised":
+                    dates.setdefault(tag, elem)
+        elif section.tag == "PubmedData":
+            for elem in section:
+                if elem.tag == "ArticleIdList":
+                    for article_id in elem:
+                        if article_id.get("IdType") == "doi":
+                            doi = article_id.text or ""
+                            break
+
+    return Paper(
+        pmid=pmid,
+        title=title,
+        authors="; ".join(authors),
+        journal=journal or medline_ta,
+        publication_date=_first_date(dates) or "",
+        volume=volume,
+        issue=issue,
+        pages=pages,
+        abstract=" ".join(abstract_texts),
+        keywords="; ".join(keywords),
+        doi=doi,
+        pubmed_url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}",
+    )
+
+def _walk_article(article_elem, authors: List[str], abstract_texts: List[str], dates: Dict) -> Tuple[str, ...]:
+    """Collect authors, abstract and dates from an Article element; return its scalar fields."""
+    title = journal = volume = issue = pages = ""
+    for part in article_elem:
+        tag = part.tag
+        if tag == "Journal":
+            for journal_elem in part:
+                if journal_elem.tag == "Title":
+                    journal = sys.intern(journal_elem.text or "")
+                elif journal_elem.tag == "JournalIssue":
+                    for issue_elem in journal_elem:
+                        issue_tag = issue_elem.tag
+                        if issue_tag == "Volume":
+                            volume = sys.intern(issue_elem.text or "")
+                        elif issue_tag == "Issue":
+                            issue = sys.intern(issue_elem.text or "")
+                        elif issue_tag == "PubDate":
+                            dates.setdefault("PubDate", issue_elem)
+        elif tag == "ArticleTitle":
+            title = "".join(part.itertext()).strip()
+        elif tag == "Pagination":
+            for pagination in part:
+                if pagination.tag == "MedlinePgn":
+                    pages = pagination.text or ""
+        elif tag == "Abstract":
+            for text_elem in part:
+                if text_elem.tag != "AbstractText":
+                    continue
+                # itertext keeps text inside inline markup such as <i> or <sup>
+                text = "".join(text_elem.itertext())
+                if text:
+                    label = text_elem.get("Label")
+                    if label:
+                        abstract_texts.append(f"{label}: {text}")
+                    else:
+                        abstract_texts.append(text)
+        elif tag == "AuthorList":
+            for author in part:
+                lastname = forename = None
+                for name in author:
+                    if name.tag == "LastName":
+                        lastname = name.text
+                    elif name.tag == "ForeName":
+                        forename = name.text
+                if lastname is not None and forename is not None:
+                    authors.append(f"{forename} {lastname}")
+                elif lastname is not None:
+                    authors.append(lastname)
+        elif tag == "ArticleDate":
+            dates.setdefault("ArticleDate", part)
+    return title, journal, volume, issue, pages
+
+def _first_date(dates: Dict) -> Optional[str]:
+    """Format the most preferred collected date element that has a year."""
+    for date_tag in DATE_TAGS:
+        date_elem = dates.get(date_tag)
+        if date_elem is None:
+            continue
+        year = month = day = None
+        for part in date_elem:
+            if part.tag == "Year":
+                year = part.text
+            elif part.tag == "Month":
+                month = part.text
+            elif part.tag == "Day":
+                day = part.text
         
-        papers.append(paper_info)
-    
-    return papers
+        if year is not None:
+            date_str = year
+            if month is not None:
+                date_str += f"-{_two_digits(month)}"
+                if day is not None:
+                    date_str += f"-{_two_digits(day)}"
+            return date_str
+    return None
 
-def save_to_csv(data: List[Dict], filename: str = "output.csv"):
+def _two_digits(value: str) -> str:
+    """Zero-pad a numeric month/day, mapping month abbreviations to their number."""
+    if value.isdigit():
+        return f"{int(value):02d}"
+    return MONTH_MAP.get(value[:3], value)
+
+def save_to_csv(papers: List[Paper], filename: str = "output.csv"):
     """Save paper data to CSV file."""
-    if not data:
+    if not papers:
         print("No data to save.")
         return
     
-    df = pd.DataFrame(data)
-    
-    # Reorder columns for better readability
-    desired_columns = [
-        "pmid", "title", "authors", "journal", "publication_date",
-        "volume", "issue", "pages", "abstract", "keywords", "doi", "pubmed_url"
-    ]
-    
-    # Keep only columns that exist in the data
-    columns_to_use = [col for col in desired_columns if col in df.columns]
-    if columns_to_use:
-        df = df[columns_to_use]
-    
-    df.to_csv(filename, index=False)
-    print(f"Saved {len(data)} papers to {filename}")
\ No newline at end of file
+    with open(filename, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        batch = StringIO()
+        writer = csv.writer(batch, lineterminator="\n")
+        writer.writerow(DESIRED_COLUMNS)
+        # Paper fields are already strings in column order, so records are written as-is
+        for start in range(0, len(papers), WRITE_BATCH_ROWS):
+            _write_rows(batch, writer, papers[start:start + WRITE_BATCH_ROWS])
+            f.write(batch.getvalue())
+            batch.seek(0)
+            batch.truncate()
+    print(f"Saved {len(papers)} papers to {filename}")
+
+def _write_rows(out, writer, rows):
+    """Write rows as CSV, joining rows that need no quoting without the csv module."""
+    separators = len(DESIRED_COLUMNS) - 1
+    plain = []
+    for row in rows:
+        line = ",".join(row)
+        if line.count(",") == separators and '"' not in line and "\n" not in line and "\r" not in line:
+            plain.append(line)
+            continue
+        if plain:
+            out.write("\n".join(plain))
+            out.write("\n")
+            plain = []
+        writer.writerow(row)
+    if plain:
+        out.write("\n".join(plain))
+        out.write("\n")
\ No newline at end of file
@@ -0,0 +1,186 @@
+import csv
+import time
+import unittest
+import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pubmed_fetcher import cli, fetcher
+from pubmed_fetcher.fetcher import Paper
+
+FIXTURE = Path(__file__).parent / "fixtures" / "pubmed_articles.xml"
+
+EXPECTED = [
+    Paper(
+        pmid="38234567",
+        title="Machine Learning in Healthcare, a review",
+        authors="John Smith; Solo",
+        journal="Journal of Medical Internet Research",
+        publication_date="2024-01-05",
+        volume="26",
+        issue="1",
+        pages="e123",
+        abstract='BACKGROUND: Rates rose by 103 in vitro. METHODS: We did "things".',
+        keywords="AI; health",
+        doi="10.2196/12345",
+        pubmed_url="https://pubmed.ncbi.nlm.nih.gov/38234567",
+    ),
+    Paper(
+        pmid="111",
+        title="Plain title",
+        authors="",
+        journal="Plain J",
+        publication_date="2023-12-09",
+        volume="",
+        issue="",
+        pages="",
+        abstract="",
+        keywords="",
+        doi="",
+        pubmed_url="https://pubmed.ncbi.nlm.nih.gov/111",
+    ),
+]
+
+
+def parse_fixture():
+    with open(FIXTURE, "rb") as f:
+        return fetcher._parse_articles(f)
+
+
+class ExtractPaperTest(unittest.TestCase):
+    """Parse a small PubmedArticleSet through both supported XML parsers."""
+
+    @unittest.skipUnless(fetcher.HAS_LXML, "lxml is not installed")
+    def test_lxml_parser(self):
+        self.assertEqual(parse_fixture(), EXPECTED)
+
+    def test_elementtree_parser(self):
+        with mock.patch.object(fetcher, "HAS_LXML", False), mock.patch.object(fetcher, "etree", ET):
+            self.assertEqual(parse_fixture(), EXPECTED)
+
+
+class WriteRowsTest(unittest.TestCase):
+    """_write_rows must produce exactly what csv.writer would."""
+
+    def assertMatchesCsvWriter(self, rows):
+        fast = StringIO()
+        fetcher._write_rows(fast, csv.writer(fast, lineterminator="\n"), rows)
+        reference = StringIO()
+        writer = csv.writer(reference, lineterminator="\n")
+        for row in rows:
+            writer.writerow(row)
+        self.assertEqual(fast.getvalue(), reference.getvalue())
+
+    def test_special_characters(self):
+        width = len(fetcher.DESIRED_COLUMNS)
+        values = ["plain", "", "a,b", 'say "hi"', "line\nbreak", "carriage\rreturn", ",", '"', " padded "]
+        rows = [tuple([value] * width) for value in values]
+        # Mix clean and quoted rows so fast-path runs are flushed between csv.writer rows
+        rows += [tuple(values[i % len(values)] for i in range(start, start + width)) for start in range(len(values))]
+        rows.append(tuple([""] * width))
+        self.assertMatchesCsvWriter(rows)
+
+    def test_papers(self):
+        self.assertMatchesCsvWriter(EXPECTED)
+
+
+class RateLimitedAdapterTest(unittest.TestCase):
+    """Retried requests must wait for their own rate-limit slot."""
+
+    def test_retry_after_429_takes_a_new_slot(self):
+        sent = []
+        statuses = iter([429, 200])
+
+        def fake_send(adapter, request, **kwargs):
+            sent.append(time.monotonic())
+            return mock.Mock(status_code=next(statuses), headers={})
+
+        adapter = fetcher._RateLimitedAdapter(fetcher.REQUEST_INTERVAL, status_retries=fetcher.STATUS_RETRIES)
+        with mock.patch.object(HTTPAdapter, "send", fake_send):
+            response = adapter.send(mock.Mock())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(sent), 2)
+        self.assertGreaterEqual(sent[1] - sent[0], fetcher.REQUEST_INTERVAL)
+
+
+def efetch_xml(pmids):
+    articles = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID>"
+        f"<Article><ArticleTitle>Paper {pmid}</ArticleTitle></Article></MedlineCitation></PubmedArticle>"
+        for pmid in pmids
+    )
+    return f"<PubmedArticleSet>{articles}</PubmedArticleSet>".encode()
+
+
+class FetchPaperDetailsTest(unittest.TestCase):
+    def test_chunks_kept_in_order_and_failures_isolated(self):
+        paper_ids = [str(pmid) for pmid in range(1, 8)]
+        # Earlier chunks answer last, so fetches complete out of order
+        delays = {"1": 0.2, "4": 0.1, "7": 0.0}
+
+        def post(url, data):
+            pmids = data["id"].split(",")
+            time.sleep(delays[pmids[0]])
+            response = mock.Mock(content=efetch_xml(pmids))
+            if "4" in pmids:
+                response.raise_for_status.side_effect = requests.HTTPError("502 Bad Gateway")
+            return response
+
+        session = mock.Mock()
+        session.post.side_effect = post
+        with mock.patch.object(fetcher, "EFETCH_CHUNK_SIZE", 3), \
+                mock.patch.object(fetcher, "get_session", return_value=session), \
+                redirect_stdout(StringIO()) as out:
+            papers = fetcher.fetch_paper_details(paper_ids)
+
+        self.assertEqual(session.post.call_count, 3)
+        self.assertEqual([paper.pmid for paper in papers], ["1", "2", "3", "7"])
+        self.assertEqual(papers[3].title, "Paper 7")
+        self.assertIn("502 Bad Gateway", out.getvalue())
+
+
+def esearch_session(payload):
+    """Mock session whose GET returns the given esearch JSON payload."""
+    session = mock.Mock()
+    session.get.return_value.json.return_value = payload
+    return session
+
+
+class FetchPubmedIdsTest(unittest.TestCase):
+    def test_max_results_capped_at_retmax(self):
+        session = esearch_session({"esearchresult": {"idlist": ["1", "2"]}})
+        with mock.patch.object(fetcher, "get_session", return_value=session), redirect_stdout(StringIO()) as out:
+            self.assertEqual(fetcher.fetch_pubmed_ids("cancer", 20000), ["1", "2"])
+        self.assertEqual(session.get.call_args.kwargs["params"]["retmax"], fetcher.MAX_RETMAX)
+        self.assertIn(str(fetcher.MAX_RETMAX), out.getvalue())
+
+    def test_esearch_error_reported(self):
+        session = esearch_session({"esearchresult": {"ERROR": "Search Backend failed"}})
+        with mock.patch.object(fetcher, "get_session", return_value=session), redirect_stdout(StringIO()) as out:
+            self.assertEqual(fetcher.fetch_pubmed_ids("cancer"), [])
+        self.assertIn("Search Backend failed", out.getvalue())
+
+
+class MainTest(unittest.TestCase):
+    def test_options_used_when_query_prompted(self):
+        papers = [EXPECTED[0]]
+        with mock.patch("sys.argv", ["get-papers-list", "-n", "50", "-o", "results"]), \
+                mock.patch("builtins.input", return_value="cancer") as prompt, \
+                mock.patch.object(cli, "fetch_pubmed_ids", return_value=["38234567"]) as fetch_ids, \
+                mock.patch.object(cli, "fetch_paper_details", return_value=papers), \
+                mock.patch.object(cli, "save_to_csv") as save, \
+                redirect_stdout(StringIO()):
+            cli.main()
+        prompt.assert_called_once()
+        fetch_ids.assert_called_once_with("cancer", 50)
+        save.assert_called_once_with(papers, "results.csv")
+
+
+if __name__ == "__main__":
+    unittest.main()